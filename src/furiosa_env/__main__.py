@@ -0,0 +1,18 @@
+"""
+furiosa-setup 진입점. `facts --json [--refresh]`은 typer/rich 로딩 없이 바로 출력.
+"""
+import sys
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["facts"] and "--json" in args and set(args[1:]) <= {"--json", "--refresh"}:
+        from .facts import facts_json
+        sys.stdout.write(facts_json(refresh="--refresh" in args))
+        return
+    from .cli import app
+    app()
+
+
+if __name__ == "__main__":
+    main()
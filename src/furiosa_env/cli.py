@@ -1,33 +1,41 @@
 import os
+import re
 import sys
 import shlex
+import shutil
 import subprocess
 from pathlib import Path
 import typer
 from rich import print
 from rich.panel import Panel
 
+from .facts import facts_json, host_facts, invalidate_host_facts
+
 app = typer.Typer(help="FuriosaAI 환경(드라이버/펌웨어/PE Runtime/LLM) 설치를 uv 기반으로 자동화하는 CLI")
 
 # ------------------------------
 # Utils
 # ------------------------------
-def run(cmd: str, sudo: bool = False, check: bool = True):
+def run(cmd: str, sudo: bool = False, check: bool = True, invalidates_facts: bool = False):
     """
     Run a shell command. When sudo=True, elevate only the command (no nested shells).
+    When invalidates_facts=True, drop the cached host facts afterwards (e.g. pip installs).
     """
-    if sudo:
-        proc = subprocess.run(["sudo", "bash", "-lc", cmd], check=check)
-    else:
-        proc = subprocess.run(["bash", "-lc", cmd], check=check)
+    try:
+        if sudo:
+            proc = subprocess.run(["sudo", "bash", "-lc", cmd], check=check)
+        else:
+            proc = subprocess.run(["bash", "-lc", cmd], check=check)
+    finally:
+        if invalidates_facts:
+            invalidate_host_facts()
     return proc
 
 def require_root_notice():
     print(Panel.fit("[bold yellow]일부 단계는 관리자 권한(sudo)이 필요합니다.[/bold yellow]"))
 
 def os_codename() -> str:
-    code = subprocess.check_output(["bash", "-lc", ". /etc/os-release && echo \"$VERSION_CODENAME\""], text=True).strip()
-    return code
+    return host_facts()["codename"]
 
 def warn_if_unsupported_os():
     code = os_codename()
@@ -42,16 +50,186 @@ def py_ok_for_llm() -> bool:
         print(Panel.fit(f"[bold red]경고:[/bold red] LLM 요구사항은 Python 3.9~3.12 입니다. 현재 python {v.major}.{v.minor}"))
     return ok
 
+def missing_packages(*names) -> list:
+    """
+    host facts 기준으로 아직 설치되지 않은 APT 패키지만 반환.
+    """
+    installed = host_facts()["packages"]
+    return [name for name in names if name not in installed]
+
 def torch_version():
+    return host_facts()["python_packages"].get("torch")
+
+# ------------------------------
+# Host topology (PCIe/NUMA)
+# ------------------------------
+FURIOSA_PCI_VENDOR = "0x1ed2"
+FURIOSA_NPU_DEVICE_IDS = {"0x0000", "0x0001"}  # Warboy, RNGD
+DEFAULT_SYSFS_ROOT = os.environ.get("FURIOSA_SYSFS_ROOT", "/sys")
+DEFAULT_PROCFS_ROOT = os.environ.get("FURIOSA_PROCFS_ROOT", "/proc")
+
+def read_text(path: Path, default: str = "") -> str:
     try:
-        import importlib
-        spec = importlib.util.find_spec("torch")
-        if not spec:
-            return None
-        import torch  # type: ignore
-        return getattr(torch, "__version__", None)
-    except Exception:
-        return None
+        return path.read_text().strip()
+    except OSError:
+        return default
+
+def parse_cpulist(text: str) -> list:
+    """
+    "0-3,8,10-11" 형식의 cpulist를 정렬된 CPU 번호 리스트로 변환.
+    """
+    cpus = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.update(range(int(lo), int(hi) + 1))
+        else:
+            cpus.add(int(part))
+    return sorted(cpus)
+
+def format_cpulist(cpus) -> str:
+    """
+    CPU 번호 리스트를 "0-3,8" 형식의 cpulist로 변환 (taskset/smp_affinity_list 용).
+    """
+    ranges = []
+    for cpu in sorted(set(cpus)):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(lo) if lo == hi else f"{lo}-{hi}" for lo, hi in ranges)
+
+def driver_npu_indices(bdfs, sysfs_root: str = DEFAULT_SYSFS_ROOT) -> dict:
+    """
+    드라이버 장치 노드(/sys/class/*/...npuN...)의 device 링크를 따라 bdfs 에 속한 PCI 주소(BDF) → npu 인덱스 매핑을 반환.
+    같은 BDF가 서로 다른 인덱스로 보이면 신뢰할 수 없으므로 빈 dict를 반환.
+    """
+    class_dir = Path(sysfs_root) / "class"
+    if not class_dir.is_dir():
+        return {}
+    mapping = {}
+    for cls in class_dir.iterdir():
+        try:
+            entries = list(cls.iterdir())
+        except OSError:
+            continue
+        for entry in entries:
+            match = re.search(r"npu(\d+)", entry.name)
+            if not match or not (entry / "device").exists():
+                continue
+            bdf = (entry / "device").resolve().name
+            if bdf not in bdfs:
+                continue
+            index = int(match.group(1))
+            if mapping.setdefault(bdf, index) != index:
+                return {}
+    return mapping
+
+def npu_topology(sysfs_root: str = DEFAULT_SYSFS_ROOT) -> list:
+    """
+    sysfs에서 FuriosaAI NPU(PCI function)를 찾아 NUMA 노드/로컬 CPU/IRQ 정보를 반환.
+    npu 인덱스는 드라이버 장치 노드 기준이며, 확인할 수 없을 때만 경고 후 BDF 정렬 순서를 사용.
+    """
+    root = Path(sysfs_root)
+    pci_dir = root / "bus" / "pci" / "devices"
+    if not pci_dir.is_dir():
+        return []
+
+    npus = []
+    for dev in sorted(pci_dir.iterdir(), key=lambda p: p.name):
+        if read_text(dev / "vendor").lower() != FURIOSA_PCI_VENDOR:
+            continue
+        if read_text(dev / "device").lower() not in FURIOSA_NPU_DEVICE_IDS:
+            continue
+        node = int(read_text(dev / "numa_node", "-1") or -1)
+        cpus = parse_cpulist(read_text(dev / "local_cpulist"))
+        if not cpus and node >= 0:
+            cpus = parse_cpulist(read_text(root / "devices" / "system" / "node" / f"node{node}" / "cpulist"))
+        msi_dir = dev / "msi_irqs"
+        if msi_dir.is_dir():
+            irqs = sorted(int(p.name) for p in msi_dir.iterdir() if p.name.isdigit())
+        else:
+            irq = read_text(dev / "irq", "0")
+            irqs = [int(irq)] if irq.isdigit() and int(irq) > 0 else []
+        npus.append({
+            "index": len(npus),
+            "bdf": dev.name,
+            "device": read_text(dev / "device"),
+            "numa_node": node,
+            "cpus": cpus,
+            "irqs": irqs,
+        })
+
+    driver_indices = driver_npu_indices({npu["bdf"] for npu in npus}, sysfs_root)
+    if npus and {npu["bdf"] for npu in npus} <= driver_indices.keys():
+        for npu in npus:
+            npu["index"] = driver_indices[npu["bdf"]]
+        npus.sort(key=lambda n: n["index"])
+    elif npus:
+        print("[yellow]경고: 드라이버 장치 노드에서 npu 인덱스를 확인하지 못해 PCI 주소(BDF) 순서로 가정합니다.[/yellow]")
+    return npus
+
+def parse_npu_indices(devices: str) -> list:
+    """
+    "npu:0,npu:1:0-3" 같은 --devices 문자열에서 npu 인덱스만 추출.
+    """
+    indices = []
+    for spec in devices.split(","):
+        fields = spec.strip().split(":")
+        if len(fields) >= 2 and fields[0] == "npu" and fields[1].isdigit():
+            indices.append(int(fields[1]))
+    return indices
+
+def write_sysfs(path: Path, value: str, dry_run: bool = False) -> bool:
+    """
+    sysfs/procfs 값 쓰기. 쓰기 권한이 없으면 sudo tee로 재시도. 성공 여부를 반환.
+    """
+    if dry_run:
+        print(f"[dim](dry-run) {path} <- {value}[/dim]")
+        return True
+    if os.access(path, os.W_OK):
+        try:
+            path.write_text(value)
+            return True
+        except OSError as e:
+            print(f"[yellow]{path} 쓰기 실패: {e}[/yellow]")
+            return False
+    proc = run(f"echo {shlex.quote(value)} | tee {shlex.quote(str(path))} > /dev/null", sudo=True, check=False)
+    if proc.returncode != 0:
+        print(f"[yellow]{path} 쓰기 실패 (sudo tee 종료 코드 {proc.returncode})[/yellow]")
+        return False
+    return True
+
+def numa_pin_prefix(devices: str, sysfs_root: str = DEFAULT_SYSFS_ROOT) -> str:
+    """
+    --devices 로 지정된 NPU의 로컬 NUMA 노드/CPU에 고정하는 명령 접두어를 생성.
+    numactl이 있으면 CPU+메모리 바인딩, 없으면 taskset으로 CPU만 고정.
+    """
+    topo = {n["index"]: n for n in npu_topology(sysfs_root)}
+    if not topo:
+        print(f"[yellow]NUMA 고정 건너뜀: {sysfs_root} 에서 FuriosaAI 장치를 찾지 못했습니다.[/yellow]")
+        return ""
+    indices = parse_npu_indices(devices)
+    missing = [i for i in indices if i not in topo]
+    if not indices or missing:
+        print(f"[yellow]NUMA 고정 건너뜀: --devices {devices} 의 npu 인덱스를 토폴로지에서 찾지 못했습니다.[/yellow]")
+        return ""
+    selected = [topo[i] for i in indices]
+    nodes = sorted({n["numa_node"] for n in selected if n["numa_node"] >= 0})
+    cpus = sorted({c for n in selected for c in n["cpus"]})
+    if nodes and not missing_packages("numactl"):
+        node_list = ",".join(str(n) for n in nodes)
+        return f"numactl --cpunodebind={node_list} --membind={node_list} "
+    if cpus and shutil.which("taskset"):
+        return f"taskset -c {format_cpulist(cpus)} "
+    if not nodes and not cpus:
+        print("[yellow]NUMA 고정 건너뜀: 장치의 NUMA 노드/로컬 CPU 정보가 없습니다.[/yellow]")
+    else:
+        print("[yellow]NUMA 고정 건너뜀: numactl 패키지와 taskset 을 찾지 못했습니다.[/yellow]")
+    return ""
 
 # ------------------------------
 # Base prereqs
@@ -62,22 +240,113 @@ def check_requirements():
     OS/커널/권한 등 최소 요구사항 점검(안내용).
     """
     print(Panel.fit("[bold]요구사항[/bold]\n- Ubuntu 22.04 LTS (또는 Debian Bookworm) 이상\n- Linux Kernel 6.3 이상\n- 관리자 권한"))
-    run("uname -r && (lsb_release -a || cat /etc/os-release)", check=False)
+    facts = host_facts()
+    print(f"[bold]현재 호스트:[/bold] {facts['os_id']} {facts['os_version']} ({facts['codename'] or '-'}), kernel {facts['kernel']}, {facts['arch']}{' (WSL)' if facts['is_wsl'] else ''}")
+
+@app.command()
+def facts(as_json: bool = typer.Option(False, "--json", help="JSON으로 출력"),
+          refresh: bool = typer.Option(False, "--refresh", help="캐시를 무시하고 다시 수집")):
+    """
+    캐시된 호스트 정보(OS/아키텍처/커널/WSL/패키지/Python) 출력.
+    """
+    if as_json:
+        sys.stdout.write(facts_json(refresh=refresh))
+        return
+    info = host_facts(refresh=refresh)
+    for key in ("os_id", "os_version", "codename", "arch", "kernel", "is_wsl", "python", "python_executable"):
+        print(f"[bold]{key}:[/bold] {info[key]}")
+    print("[bold]packages:[/bold]")
+    for name, version in sorted(info["packages"].items()):
+        print(f"  - {name} {version}")
+    print("[bold]python_packages:[/bold]")
+    for name, version in sorted(info["python_packages"].items()):
+        print(f"  - {name} {version or '미설치'}")
 
 @app.command()
 def check_devices():
     """
-    FuriosaAI PCIe 장치 인식 여부 확인. lspci 없으면 설치 후 갱신.
+    FuriosaAI PCIe 장치 인식 여부 확인. pciutils가 없으면 설치 후 PCI ID 갱신.
     """
     require_root_notice()
-    # Try scan
-    run("lspci -nn | grep -i FuriosaAI || true", check=False)
-    print("[bold]lspci가 없다면 설치 중...[/bold]")
-    run("apt update && apt install -y pciutils", sudo=True)
-    run("update-pciids", sudo=True)
+    if missing_packages("pciutils"):
+        print("[bold]lspci가 없어 pciutils 설치 중...[/bold]")
+        run("apt update && apt install -y pciutils", sudo=True)
+        run("update-pciids", sudo=True)
     print("[bold green]장치 스캔 결과:[/bold green]")
     run("lspci -nn | grep -i FuriosaAI || echo 'FuriosaAI 장치를 찾지 못했습니다.'", check=False)
 
+@app.command("tune-host")
+def tune_host(sysfs_root: str = typer.Option(DEFAULT_SYSFS_ROOT, "--sysfs-root", help="sysfs 루트 (테스트용 가짜 트리 지정 가능)"),
+              procfs_root: str = typer.Option(DEFAULT_PROCFS_ROOT, "--procfs-root", help="procfs 루트 (IRQ affinity 경로)"),
+              governor: str = typer.Option("performance", help="NPU 로컬 CPU에 적용할 cpufreq governor (빈 값이면 건너뜀)"),
+              hugepages: int = typer.Option(0, help="NPU 로컬 NUMA 노드별 2MB hugepage 최소 개수 (현재 값보다 클 때만 늘림, 0이면 건너뜀)"),
+              irq_affinity: bool = typer.Option(True, "--irq-affinity/--no-irq-affinity", help="NPU IRQ를 로컬 CPU로 고정"),
+              dry_run: bool = typer.Option(False, "--dry-run", help="적용하지 않고 변경 내용만 출력")):
+    """
+    NPU PCIe/NUMA 토폴로지 기반 호스트 튜닝(CPU governor, hugepage, IRQ affinity).
+    """
+    topo = npu_topology(sysfs_root)
+    if not topo:
+        print(Panel.fit(f"[bold red]{sysfs_root} 에서 FuriosaAI 장치를 찾지 못했습니다.[/bold red]"))
+        raise typer.Exit(code=1)
+
+    if not dry_run:
+        require_root_notice()
+    print("[bold]NPU 토폴로지:[/bold]")
+    for npu in topo:
+        print(f"- npu:{npu['index']}  {npu['bdf']}  NUMA node {npu['numa_node']}  CPUs {format_cpulist(npu['cpus']) or '-'}  IRQs {len(npu['irqs'])}")
+
+    sys_root = Path(sysfs_root)
+    failures = []
+    local_cpus = sorted({c for npu in topo for c in npu["cpus"]})
+    local_nodes = sorted({npu["numa_node"] for npu in topo if npu["numa_node"] >= 0})
+
+    if governor:
+        print(f"[bold]CPU governor → {governor}[/bold]")
+        for cpu in local_cpus:
+            path = sys_root / "devices" / "system" / "cpu" / f"cpu{cpu}" / "cpufreq" / "scaling_governor"
+            if path.exists() and not write_sysfs(path, governor, dry_run):
+                failures.append(path)
+
+    if hugepages > 0:
+        print(f"[bold]Hugepage(2MB) → 노드당 최소 {hugepages}개[/bold]")
+        for node in local_nodes:
+            path = sys_root / "devices" / "system" / "node" / f"node{node}" / "hugepages" / "hugepages-2048kB" / "nr_hugepages"
+            if not path.exists():
+                continue
+            current = int(read_text(path, "0") or 0)
+            if current >= hugepages:
+                print(f"[dim]node{node}: 이미 {current}개 예약됨, 유지[/dim]")
+            elif not write_sysfs(path, str(hugepages), dry_run):
+                failures.append(path)
+            elif not dry_run:
+                # 메모리 단편화 시 커널이 요청보다 적게 예약할 수 있음
+                reserved = int(read_text(path, "0") or 0)
+                if reserved < hugepages:
+                    print(f"[yellow]node{node}: hugepage {hugepages}개 요청, 실제 예약 {reserved}개[/yellow]")
+                    failures.append(path)
+
+    if irq_affinity:
+        print("[bold]IRQ affinity → NPU 로컬 CPU[/bold]")
+        for npu in topo:
+            if not npu["cpus"]:
+                continue
+            cpulist = format_cpulist(npu["cpus"])
+            for irq in npu["irqs"]:
+                path = Path(procfs_root) / "irq" / str(irq) / "smp_affinity_list"
+                if path.exists() and not write_sysfs(path, cpulist, dry_run):
+                    failures.append(path)
+        if not dry_run and shutil.which("irqbalance"):
+            print("[yellow]irqbalance가 실행 중이면 IRQ affinity를 덮어쓸 수 있습니다. 필요 시 'systemctl stop irqbalance'[/yellow]")
+
+    if failures:
+        print(Panel.fit(f"[bold red]{len(failures)}개 항목 적용 실패:[/bold red]\n" + "\n".join(f"- {p}" for p in failures)))
+        raise typer.Exit(code=1)
+    if dry_run:
+        print("[bold yellow]dry-run: 변경 사항은 적용되지 않았습니다.[/bold yellow]")
+    else:
+        print("[bold green]호스트 튜닝 완료[/bold green]")
+
 @app.command()
 def setup_apt():
     """
@@ -86,17 +355,16 @@ def setup_apt():
     require_root_notice()
     warn_if_unsupported_os()
     print("[bold]필수 패키지 설치 및 GPG 키 등록...[/bold]")
-    run("apt update && apt install -y curl gnupg", sudo=True)
+    missing = missing_packages("curl", "gnupg")
+    if missing:
+        run(f"apt update && apt install -y {' '.join(missing)}", sudo=True)
 
     # 키 저장 (직접 최종 위치에 저장)
     run("curl -fsSL https://packages.cloud.google.com/apt/doc/apt-key.gpg | gpg --dearmor | sudo tee /etc/apt/trusted.gpg.d/cloud.google.gpg > /dev/null")
 
-    # 코드네임/아키텍처를 파이썬에서 문자열로 확보
+    # 코드네임/아키텍처는 host facts에서 확보
     code = os_codename()  # 예: jammy, bookworm, focal
-    try:
-        arch = subprocess.check_output(["bash", "-lc", "dpkg --print-architecture"], text=True).strip()
-    except Exception:
-        arch = "amd64"
+    arch = host_facts()["arch"] or "amd64"
 
     print(f"[bold]배포판 코드네임 확인:[/bold] {code}")
     apt_line = f"deb [arch={arch}] http://asia-northeast3-apt.pkg.dev/projects/furiosa-ai {code} main"
@@ -112,23 +380,22 @@ def install_prereqs():
     드라이버/PE Runtime 및 유틸리티 설치 전 공용 의존성 설치.
     """
     require_root_notice()
-    run("apt update", sudo=True)
 
     # WSL2 환경 감지
-    try:
-        with open("/proc/version", "r") as f:
-            proc_version = f.read()
-        is_wsl = "microsoft" in proc_version.lower() or "wsl" in proc_version.lower()
-    except Exception:
-        is_wsl = False
-
-    if is_wsl:
+    facts = host_facts()
+    if facts["is_wsl"]:
         print("[yellow]WSL2 환경 감지: 커널 헤더 패키지 설치를 건너뜁니다.[/yellow]")
-        run("apt install -y build-essential", sudo=True)
+        missing = missing_packages("build-essential")
     else:
-        run("apt install -y build-essential linux-modules-extra-$(uname -r) linux-headers-$(uname -r)", sudo=True)
+        kernel = facts["kernel"]
+        missing = missing_packages("build-essential", f"linux-modules-extra-{kernel}", f"linux-headers-{kernel}")
 
-    print("[bold green]커널 헤더/모듈 등 설치 완료[/bold green]")
+    if missing:
+        run("apt update", sudo=True)
+        run(f"apt install -y {' '.join(shlex.quote(name) for name in missing)}", sudo=True)
+        print("[bold green]커널 헤더/모듈 등 설치 완료[/bold green]")
+    else:
+        print("[bold green]커널 헤더/모듈 등 이미 설치되어 있습니다.[/bold green]")
 
 @app.command()
 def install_furiosa():
@@ -223,11 +490,11 @@ def install_llm(upgrade_torch: bool = typer.Option(False, help="PyTorch 2.5.1로
         print("[bold]PyTorch 2.5.1 설치/업그레이드 시도...[/bold]")
         # pip 또는 uv pip 둘 다 커버
 
-        run("python -m pip install --upgrade 'torch==2.5.1' || uv pip install --upgrade 'torch==2.5.1'")
+        run("python -m pip install --upgrade 'torch==2.5.1' || uv pip install --upgrade 'torch==2.5.1'", invalidates_facts=True)
 
     # LLM
 
-    run("python -m pip install --upgrade furiosa-llm || uv pip install --upgrade furiosa-llm")
+    run("python -m pip install --upgrade furiosa-llm || uv pip install --upgrade furiosa-llm", invalidates_facts=True)
     tv = torch_version()
     print(Panel.fit(f"[bold green]Furiosa-LLM 설치 완료[/bold green]\nTorch: {tv or '미설치'}"))
 @app.command("hf-login")
@@ -235,7 +502,7 @@ def hf_login(token: str = typer.Option(None, help="Hugging Face 토큰(옵션).
     """
     Hugging Face Hub 로그인 (일부 모델 실행 위해 필요).
     """
-    run("python -m pip install --upgrade 'huggingface_hub[cli]'")
+    run("python -m pip install --upgrade 'huggingface_hub[cli]'", invalidates_facts=True)
     if token:
         run(f"huggingface-cli login --token {shlex.quote(token)}")
     else:
@@ -246,11 +513,14 @@ def hf_login(token: str = typer.Option(None, help="Hugging Face 토큰(옵션).
 def serve(model: str = typer.Argument("furiosa-ai/Llama-3.1-8B-Instruct-FP8"),
           devices: str = typer.Option("npu:0", "--devices", help='예: "npu:0"'),
           host: str = typer.Option("0.0.0.0", "--host"),
-          port: int = typer.Option(8000, "--port")):
+          port: int = typer.Option(8000, "--port"),
+          numa_pin: bool = typer.Option(True, "--numa-pin/--no-numa-pin", help="NPU 로컬 NUMA 노드의 CPU/메모리에 고정"),
+          sysfs_root: str = typer.Option(DEFAULT_SYSFS_ROOT, "--sysfs-root", help="sysfs 루트 (토폴로지 조회용)")):
     """
-    OpenAI 호환 서버 기동 (기본: 0.0.0.0:8000)
+    OpenAI 호환 서버 기동 (기본: 0.0.0.0:8000). 기본적으로 NPU 로컬 코어/메모리에 고정.
     """
-    cmd = f'furiosa-llm serve {shlex.quote(model)} --devices {shlex.quote(devices)} --host {shlex.quote(host)} --port {port}'
+    prefix = numa_pin_prefix(devices, sysfs_root) if numa_pin else ""
+    cmd = f'{prefix}furiosa-llm serve {shlex.quote(model)} --devices {shlex.quote(devices)} --host {shlex.quote(host)} --port {port}'
     print(f"[bold]Launching:[/bold] {cmd}")
     run(cmd, sudo=False, check=True)
 
@@ -0,0 +1,183 @@
+"""
+호스트 정보(host facts) 수집/캐시. CLI 시작 비용 없이 쓰도록 표준 라이브러리만 사용.
+"""
+import os
+import sys
+import json
+import time
+import sysconfig
+from pathlib import Path
+from typing import Optional, Tuple
+
+FACTS_TTL = 600  # 초
+DPKG_STATUS = Path("/var/lib/dpkg/status")
+TRACKED_PACKAGES = {"pciutils", "curl", "gnupg", "build-essential", "numactl"}
+TRACKED_PY_PACKAGES = ("torch", "furiosa-llm", "huggingface_hub")
+DPKG_ARCH = {"x86_64": "amd64", "aarch64": "arm64", "armv7l": "armhf", "i686": "i386"}
+
+_host_facts = None  # (fingerprint, facts)
+_disk_cache_disabled = False
+
+def facts_cache_path() -> Optional[Path]:
+    """
+    디스크 캐시 경로. 절대 경로의 XDG_CACHE_HOME 또는 ~/.cache 아래이며, 홈을 알 수 없으면 None.
+    """
+    xdg = os.environ.get("XDG_CACHE_HOME", "")
+    if os.path.isabs(xdg):
+        base = Path(xdg)
+    else:
+        try:
+            base = Path.home() / ".cache"
+        except (RuntimeError, KeyError):
+            return None
+    return base / "furiosa-env" / "host-facts.json"
+
+def read_os_release(path: Path = Path("/etc/os-release")) -> dict:
+    info = {}
+    for line in path.read_text().splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        info[key] = value
+    return info
+
+def dpkg_packages(kernel: str) -> Tuple[dict, Optional[str]]:
+    """
+    /var/lib/dpkg/status를 직접 읽어 furiosa-* 및 설치에 필요한 패키지의 버전과,
+    dpkg 패키지 자체의 Architecture(= dpkg --print-architecture)를 반환.
+    """
+    wanted = TRACKED_PACKAGES | {f"linux-headers-{kernel}", f"linux-modules-extra-{kernel}"}
+    packages = {}
+    native_arch = None
+    try:
+        text = DPKG_STATUS.read_text(errors="replace")
+    except OSError:
+        return packages, native_arch
+    for stanza in text.split("\n\n"):
+        fields = {}
+        for line in stanza.splitlines():
+            if line[:1] in (" ", "\t") or ":" not in line:
+                continue
+            key, value = line.split(":", 1)
+            if key in ("Package", "Status", "Version", "Architecture"):
+                fields[key] = value.strip()
+        name = fields.get("Package", "")
+        installed = fields.get("Status", "").endswith(" installed")
+        if name == "dpkg" and installed:
+            native_arch = fields.get("Architecture")
+        if installed and (name.startswith("furiosa-") or name in wanted):
+            packages[name] = fields.get("Version", "")
+    return packages, native_arch
+
+def py_packages() -> dict:
+    from importlib import metadata
+    versions = {}
+    for name in TRACKED_PY_PACKAGES:
+        try:
+            versions[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+def mtime(path) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+def facts_fingerprint() -> list:
+    """
+    캐시 유효성 키: 커널/부팅 ID, 인터프리터와 site-packages 변경 시각, dpkg status 변경 시각.
+    """
+    try:
+        boot_id = Path("/proc/sys/kernel/random/boot_id").read_text().strip()
+    except OSError:
+        boot_id = None
+    return [
+        os.uname().release,
+        boot_id,
+        sys.executable,
+        mtime(sysconfig.get_paths()["purelib"]),
+        mtime(DPKG_STATUS),
+    ]
+
+def collect_host_facts() -> dict:
+    """
+    OS/아키텍처/커널/WSL/패키지/Python 정보를 서브프로세스 없이 한 번에 수집.
+    """
+    try:
+        os_release = read_os_release()
+    except OSError:
+        os_release = {}
+    uname = os.uname()
+    try:
+        proc_version = Path("/proc/version").read_text().lower()
+    except OSError:
+        proc_version = ""
+    v = sys.version_info
+    packages, dpkg_arch = dpkg_packages(uname.release)
+    return {
+        "os_id": os_release.get("ID", ""),
+        "os_version": os_release.get("VERSION_ID", ""),
+        "codename": os_release.get("VERSION_CODENAME", ""),
+        "machine": uname.machine,
+        "arch": dpkg_arch or DPKG_ARCH.get(uname.machine, uname.machine),
+        "kernel": uname.release,
+        "is_wsl": "microsoft" in proc_version or "wsl" in proc_version,
+        "python": f"{v.major}.{v.minor}.{v.micro}",
+        "python_executable": sys.executable,
+        "packages": packages,
+        "python_packages": py_packages(),
+    }
+
+def host_facts(refresh: bool = False) -> dict:
+    """
+    호스트 정보 조회. 프로세스 내 캐시 → 디스크 캐시(TTL) → 재수집 순이며, 모두 fingerprint로 검증.
+    """
+    global _host_facts
+    fingerprint = facts_fingerprint()
+    if not refresh and _host_facts is not None and _host_facts[0] == fingerprint:
+        return _host_facts[1]
+
+    cache_path = None if _disk_cache_disabled else facts_cache_path()
+    if not refresh and cache_path is not None:
+        try:
+            cached = json.loads(cache_path.read_text())
+            if cached.get("fingerprint") == fingerprint and time.time() - cached.get("collected_at", 0) < FACTS_TTL:
+                _host_facts = (fingerprint, cached["facts"])
+                return cached["facts"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    facts = collect_host_facts()
+    _host_facts = (fingerprint, facts)
+    if cache_path is not None:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(json.dumps({"collected_at": time.time(), "fingerprint": fingerprint, "facts": facts}))
+        except OSError:
+            pass
+    return facts
+
+def invalidate_host_facts():
+    """
+    패키지 설치 등으로 호스트 상태가 바뀌었을 때 캐시 폐기.
+    디스크 캐시를 지울 수 없으면(예: sudo로 만든 파일) 이 프로세스에서는 디스크 캐시를 사용하지 않음.
+    """
+    global _host_facts, _disk_cache_disabled
+    _host_facts = None
+    cache_path = facts_cache_path()
+    if cache_path is None:
+        return
+    try:
+        cache_path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError:
+        _disk_cache_disabled = True
+
+def facts_json(refresh: bool = False) -> str:
+    return json.dumps(host_facts(refresh=refresh), indent=2, sort_keys=True) + "\n"
@@ -0,0 +1,157 @@
+import json
+import sys
+from collections import namedtuple
+
+import pytest
+
+from furiosa_env import facts
+from furiosa_env.__main__ import main
+
+real_facts_cache_path = facts.facts_cache_path
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(facts, "facts_cache_path", lambda: tmp_path / "host-facts.json")
+    monkeypatch.setattr(facts, "_host_facts", None)
+    monkeypatch.setattr(facts, "_disk_cache_disabled", False)
+
+
+@pytest.fixture
+def collect_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(facts, "collect_host_facts", lambda: calls.append(1) or {"kernel": f"k{len(calls)}"})
+    return calls
+
+
+DPKG_STATUS = """\
+Package: dpkg
+Status: install ok installed
+Priority: required
+Architecture: armhf
+Version: 1.21.22
+Description: Debian package management system
+ This package provides the low-level infrastructure.
+ Package: furiosa-bogus
+
+Package: pciutils
+Status: deinstall ok config-files
+Architecture: armhf
+Version: 1:3.9.0-4
+
+Package: furiosa-smi
+Status: install ok installed
+Architecture: armhf
+Version: 2025.1.0-3
+
+Package: linux-headers-6.8.0-40-generic
+Status: install ok installed
+Version: 6.8.0-40.40
+
+Package: linux-headers-6.5.0-1-generic
+Status: install ok installed
+Version: 6.5.0-1.1
+
+Package: vim
+Status: install ok installed
+Version: 2:9.0.1378-2
+"""
+
+
+def test_dpkg_packages(tmp_path, monkeypatch):
+    status = tmp_path / "status"
+    status.write_text(DPKG_STATUS)
+    monkeypatch.setattr(facts, "DPKG_STATUS", status)
+    packages, arch = facts.dpkg_packages("6.8.0-40-generic")
+    assert arch == "armhf"
+    # config-files만 남은 패키지, 다른 커널의 헤더, 설명 continuation 라인은 제외
+    assert packages == {"furiosa-smi": "2025.1.0-3", "linux-headers-6.8.0-40-generic": "6.8.0-40.40"}
+
+
+def test_dpkg_packages_missing_status(tmp_path, monkeypatch):
+    monkeypatch.setattr(facts, "DPKG_STATUS", tmp_path / "missing")
+    assert facts.dpkg_packages("6.8.0") == ({}, None)
+
+
+def test_read_os_release(tmp_path):
+    os_release = tmp_path / "os-release"
+    os_release.write_text('# comment\nID=ubuntu\nVERSION_ID="22.04"\nVERSION_CODENAME=jammy\nPRETTY_NAME=\'Ubuntu 22.04 LTS\'\n\n')
+    assert facts.read_os_release(os_release) == {
+        "ID": "ubuntu",
+        "VERSION_ID": "22.04",
+        "VERSION_CODENAME": "jammy",
+        "PRETTY_NAME": "Ubuntu 22.04 LTS",
+    }
+
+
+Uname = namedtuple("Uname", "sysname nodename release version machine")
+
+
+@pytest.mark.parametrize("dpkg_arch, machine, proc_version, arch, is_wsl", [
+    ("armhf", "aarch64", "Linux version 6.8.0 (gcc)", "armhf", False),
+    (None, "aarch64", "Linux version 6.8.0 (gcc)", "arm64", False),
+    (None, "x86_64", "Linux version 5.15.153.1-microsoft-standard-WSL2", "amd64", True),
+])
+def test_collect_host_facts_arch_and_wsl(dpkg_arch, machine, proc_version, arch, is_wsl, monkeypatch):
+    monkeypatch.setattr(facts.os, "uname", lambda: Uname("Linux", "host", "6.8.0", "#1", machine))
+    monkeypatch.setattr(facts, "dpkg_packages", lambda kernel: ({}, dpkg_arch))
+    monkeypatch.setattr(facts, "read_os_release", lambda: {"VERSION_CODENAME": "jammy"})
+    real_read_text = facts.Path.read_text
+    monkeypatch.setattr(facts.Path, "read_text", lambda self, *a, **kw:
+                        proc_version if str(self) == "/proc/version" else real_read_text(self, *a, **kw))
+    info = facts.collect_host_facts()
+    assert info["arch"] == arch
+    assert info["is_wsl"] is is_wsl
+    assert info["codename"] == "jammy"
+
+
+def test_cache_path_without_home(monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", "")
+
+    def no_home():
+        raise RuntimeError("Could not determine home directory.")
+
+    monkeypatch.setattr(facts.Path, "home", no_home)
+    assert real_facts_cache_path() is None
+    monkeypatch.setenv("XDG_CACHE_HOME", "/tmp/xdg")
+    assert str(real_facts_cache_path()) == "/tmp/xdg/furiosa-env/host-facts.json"
+
+
+def test_cached_in_process_and_on_disk(collect_calls, monkeypatch):
+    assert facts.host_facts() == {"kernel": "k1"}
+    assert facts.host_facts() == {"kernel": "k1"}
+    monkeypatch.setattr(facts, "_host_facts", None)
+    assert facts.host_facts() == {"kernel": "k1"}
+    assert len(collect_calls) == 1
+    assert facts.host_facts(refresh=True) == {"kernel": "k2"}
+
+
+def test_fingerprint_change_invalidates(collect_calls, monkeypatch):
+    facts.host_facts()
+    fingerprint = facts.facts_fingerprint()
+    monkeypatch.setattr(facts, "facts_fingerprint", lambda: ["new-kernel"] + fingerprint[1:])
+    assert facts.host_facts() == {"kernel": "k2"}
+
+
+def test_invalidate_without_permission_disables_disk_cache(collect_calls, monkeypatch):
+    facts.host_facts()
+
+    def unlink(self, *args, **kwargs):
+        raise PermissionError(13, "Permission denied")
+
+    monkeypatch.setattr(facts.Path, "unlink", unlink)
+    facts.invalidate_host_facts()
+    assert facts.host_facts() == {"kernel": "k2"}
+
+
+@pytest.mark.parametrize("argv", [
+    ["facts", "--json"],
+    ["facts", "--json", "--refresh"],
+    ["facts", "--refresh", "--json"],
+])
+def test_main_fast_path(argv, collect_calls, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", ["furiosa-setup"] + argv)
+    monkeypatch.delitem(sys.modules, "furiosa_env.cli", raising=False)
+    main()
+    assert json.loads(capsys.readouterr().out) == {"kernel": "k1"}
+    assert "furiosa_env.cli" not in sys.modules
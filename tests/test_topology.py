@@ -0,0 +1,173 @@
+from types import SimpleNamespace
+
+import pytest
+from typer.testing import CliRunner
+
+from furiosa_env import cli
+
+
+def make_npu(sysfs, bdf, numa_node, local_cpulist=None, msi_irqs=None, irq=None, device="0x0001"):
+    dev = sysfs / "bus" / "pci" / "devices" / bdf
+    dev.mkdir(parents=True)
+    (dev / "vendor").write_text("0x1ed2\n")
+    (dev / "device").write_text(device + "\n")
+    (dev / "numa_node").write_text(f"{numa_node}\n")
+    if local_cpulist is not None:
+        (dev / "local_cpulist").write_text(local_cpulist + "\n")
+    if msi_irqs is not None:
+        (dev / "msi_irqs").mkdir()
+        for n in msi_irqs:
+            (dev / "msi_irqs" / str(n)).write_text("msix\n")
+    if irq is not None:
+        (dev / "irq").write_text(f"{irq}\n")
+    return dev
+
+
+def link_driver_node(sysfs, name, dev):
+    entry = sysfs / "class" / "rngd_mgmt" / name
+    entry.mkdir(parents=True)
+    (entry / "device").symlink_to(dev)
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    root = tmp_path / "sys"
+    make_npu(root, "0000:17:00.0", 0, local_cpulist="0-3", msi_irqs=[40, 41])
+    make_npu(root, "0000:b1:00.0", 1, irq=77)
+    node1 = root / "devices" / "system" / "node" / "node1"
+    node1.mkdir(parents=True)
+    (node1 / "cpulist").write_text("4-7\n")
+    other = root / "bus" / "pci" / "devices" / "0000:00:01.0"
+    other.mkdir(parents=True)
+    (other / "vendor").write_text("0x8086\n")
+    return root
+
+
+@pytest.mark.parametrize("text, cpus", [
+    ("0-3", [0, 1, 2, 3]),
+    ("0-3,8,10-11", [0, 1, 2, 3, 8, 10, 11]),
+    ("5", [5]),
+    ("", []),
+])
+def test_cpulist_round_trip(text, cpus):
+    assert cli.parse_cpulist(text) == cpus
+    assert cli.format_cpulist(cpus) == text
+
+
+def test_npu_topology(sysfs):
+    topo = cli.npu_topology(str(sysfs))
+    assert [n["bdf"] for n in topo] == ["0000:17:00.0", "0000:b1:00.0"]
+    assert topo[0]["cpus"] == [0, 1, 2, 3]
+    assert topo[0]["irqs"] == [40, 41]
+    # local_cpulist 없으면 node cpulist로 대체, msi_irqs 없으면 irq 사용
+    assert topo[1]["cpus"] == [4, 5, 6, 7]
+    assert topo[1]["irqs"] == [77]
+
+
+def test_npu_topology_skips_non_npu_functions(sysfs):
+    make_npu(sysfs, "0000:17:00.1", 0, local_cpulist="0-3", device="0x00ff")
+    assert [n["bdf"] for n in cli.npu_topology(str(sysfs))] == ["0000:17:00.0", "0000:b1:00.0"]
+
+
+def test_npu_topology_uses_driver_numbering(sysfs):
+    devices = sysfs / "bus" / "pci" / "devices"
+    link_driver_node(sysfs, "rngd!npu0mgmt", devices / "0000:b1:00.0")
+    link_driver_node(sysfs, "rngd!npu1mgmt", devices / "0000:17:00.0")
+    topo = cli.npu_topology(str(sysfs))
+    assert [(n["index"], n["bdf"]) for n in topo] == [(0, "0000:b1:00.0"), (1, "0000:17:00.0")]
+
+
+def fake_tools(monkeypatch, numactl=True, taskset=True):
+    monkeypatch.setattr(cli, "host_facts", lambda: {"packages": {"numactl": "2.0.16-1"} if numactl else {}})
+    monkeypatch.setattr(cli.shutil, "which", lambda name: f"/usr/bin/{name}" if taskset else None)
+
+
+def test_numa_pin_prefix(sysfs, monkeypatch):
+    fake_tools(monkeypatch)
+    assert cli.numa_pin_prefix("npu:1", str(sysfs)) == "numactl --cpunodebind=1 --membind=1 "
+    assert cli.numa_pin_prefix("npu:0:0-3,npu:1", str(sysfs)) == "numactl --cpunodebind=0,1 --membind=0,1 "
+
+    fake_tools(monkeypatch, numactl=False)
+    assert cli.numa_pin_prefix("npu:0", str(sysfs)) == "taskset -c 0-3 "
+
+    fake_tools(monkeypatch, numactl=False, taskset=False)
+    assert cli.numa_pin_prefix("npu:0", str(sysfs)) == ""
+
+
+def test_numa_pin_prefix_unknown_device(sysfs, monkeypatch, capsys):
+    fake_tools(monkeypatch)
+    assert cli.numa_pin_prefix("npu:5", str(sysfs)) == ""
+    assert "NUMA 고정 건너뜀" in capsys.readouterr().out
+
+
+def test_tune_host_dry_run(sysfs, tmp_path):
+    governor = sysfs / "devices" / "system" / "cpu" / "cpu0" / "cpufreq" / "scaling_governor"
+    governor.parent.mkdir(parents=True)
+    governor.write_text("powersave\n")
+    hugepages = sysfs / "devices" / "system" / "node" / "node1" / "hugepages" / "hugepages-2048kB" / "nr_hugepages"
+    hugepages.parent.mkdir(parents=True)
+    hugepages.write_text("1024\n")
+    irq = tmp_path / "proc" / "irq" / "40" / "smp_affinity_list"
+    irq.parent.mkdir(parents=True)
+    irq.write_text("0-7\n")
+
+    result = CliRunner().invoke(cli.app, ["tune-host", "--sysfs-root", str(sysfs), "--procfs-root", str(tmp_path / "proc"),
+                                          "--hugepages", "64", "--dry-run"])
+    assert result.exit_code == 0, result.output
+    assert "dry-run" in result.output
+    assert "호스트 튜닝 완료" not in result.output
+    assert "이미 1024개 예약됨" in result.output
+    assert governor.read_text() == "powersave\n"
+    assert irq.read_text() == "0-7\n"
+
+
+def make_tunables(sysfs, procfs):
+    governor = sysfs / "devices" / "system" / "cpu" / "cpu4" / "cpufreq" / "scaling_governor"
+    governor.parent.mkdir(parents=True)
+    governor.write_text("powersave\n")
+    hugepages = sysfs / "devices" / "system" / "node" / "node1" / "hugepages" / "hugepages-2048kB" / "nr_hugepages"
+    hugepages.parent.mkdir(parents=True)
+    hugepages.write_text("0\n")
+    irq = procfs / "irq" / "77" / "smp_affinity_list"
+    irq.parent.mkdir(parents=True)
+    irq.write_text("0-7\n")
+    return governor, hugepages, irq
+
+
+def test_tune_host_applies(sysfs, tmp_path):
+    governor, hugepages, irq = make_tunables(sysfs, tmp_path / "proc")
+
+    result = CliRunner().invoke(cli.app, ["tune-host", "--sysfs-root", str(sysfs), "--procfs-root", str(tmp_path / "proc"),
+                                          "--hugepages", "512"])
+    assert result.exit_code == 0, result.output
+    assert "호스트 튜닝 완료" in result.output
+    assert governor.read_text() == "performance"
+    assert hugepages.read_text() == "512"
+    assert irq.read_text() == "4-7"
+
+
+def test_tune_host_reports_failed_writes(sysfs, tmp_path, monkeypatch):
+    make_tunables(sysfs, tmp_path / "proc")
+    monkeypatch.setattr(cli.os, "access", lambda path, mode: False)
+    monkeypatch.setattr(cli, "run", lambda *args, **kwargs: SimpleNamespace(returncode=1))
+
+    result = CliRunner().invoke(cli.app, ["tune-host", "--sysfs-root", str(sysfs), "--procfs-root", str(tmp_path / "proc"),
+                                          "--hugepages", "512"])
+    assert result.exit_code == 1
+    assert "3개 항목 적용 실패" in result.output
+    assert "scaling_governor" in result.output
+    assert "호스트 튜닝 완료" not in result.output
+
+
+def test_tune_host_reports_short_hugepage_reservation(sysfs, tmp_path, monkeypatch):
+    _, hugepages, _ = make_tunables(sysfs, tmp_path / "proc")
+    real_write = cli.write_sysfs
+    # 커널이 요청보다 적게 예약한 상황을 흉내냄
+    monkeypatch.setattr(cli, "write_sysfs", lambda path, value, dry_run=False:
+                        real_write(path, "100" if path == hugepages else value, dry_run))
+
+    result = CliRunner().invoke(cli.app, ["tune-host", "--sysfs-root", str(sysfs), "--procfs-root", str(tmp_path / "proc"),
+                                          "--hugepages", "512"])
+    assert result.exit_code == 1
+    assert "실제 예약 100개" in result.output
+    assert "nr_hugepages" in result.output